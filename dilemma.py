@@ -1,23 +1,26 @@
 import math
-from typing import List
-from random import random, uniform
+from typing import List, Union
+from random import random, uniform, randrange
 
 import numpy as np
 
 from player import Player
+from game import MatrixGame, compile_game
 
 
 class Dilemma:
     """
     Dilemma class. Simulates entire round between two players, and each turn, as well
     """
-    def __init__(self, payoff_matrix: np.ndarray, turns_min: int, turns_max: int, error: float, player1: Player, player2: Player):
-        self.payoff_matrix: np.ndarray = payoff_matrix
+    def __init__(self, payoff_matrix: Union[np.ndarray, MatrixGame], turns_min: int, turns_max: int, error: float,
+                 player1: Player, player2: Player):
+        self.game: MatrixGame = compile_game(payoff_matrix)
+        self.payoff_matrix: np.ndarray = self.game.payoff_matrix
         self.player1: Player = player1
         self.player2: Player = player2
         self.turn: int = 0
-        self.history1: List[bool] = list()
-        self.history2: List[bool] = list()
+        self.history1: List[Union[bool, int]] = list()
+        self.history2: List[Union[bool, int]] = list()
         self.score1: int = 0
         self.score2: int = 0
         self.error = error
@@ -25,15 +28,28 @@ class Dilemma:
         self.turns_min: int = turns_min
         self.turns_max: int = turns_max
 
-    def apply_error(self, decision: bool) -> bool:
+    def apply_error(self, decision: Union[bool, int]) -> Union[bool, int]:
         """
         Applies error to the given decision.
+        In games with more than two actions, an erroneous decision becomes any other action at random.
         """
         if random() <= self.error:
-            return not decision
+            if self.game.actions == 2:
+                return not decision
+            action: int = (self.game.action_index(decision) + 1 + randrange(self.game.actions - 1)) % self.game.actions
+            return self.game.decision(action)
         else:
             return decision
 
+    def normalize_decision(self, decision) -> Union[bool, int]:
+        """
+        Normalizes the strategy output - True (cooperate) / False (defect), or the action index of any further action
+        in games with more than two actions, so that the histories keep the encoding the strategies expect
+        """
+        if self.game.actions == 2 or isinstance(decision, (bool, np.bool_)):
+            return bool(decision)
+        return self.game.decision(int(decision))
+
     def step(self, debug: bool = False) -> None:
         """
         Simulates one prisoner's dilemma (a turn for both players)
@@ -42,10 +58,12 @@ class Dilemma:
 
         :param debug: If true - print decisions
         """
-        decision1: bool = bool(self.player1.strategy(self.turn, self.turns_min, self.turns_max, self.payoff_matrix,
-                                                self.history1, self.history2, self.score1, self.score2))
-        decision2: bool = bool(self.player2.strategy(self.turn, self.turns_min, self.turns_max, self.payoff_matrix,
-                                                self.history2, self.history1, self.score2, self.score1))
+        decision1: Union[bool, int] = self.normalize_decision(self.player1.strategy(
+            self.turn, self.turns_min, self.turns_max, self.payoff_matrix,
+            self.history1, self.history2, self.score1, self.score2))
+        decision2: Union[bool, int] = self.normalize_decision(self.player2.strategy(
+            self.turn, self.turns_min, self.turns_max, self.payoff_matrix,
+            self.history2, self.history1, self.score2, self.score1))
 
         debug_string1: str = str(decision1)
         debug_string2: str = str(decision2)
@@ -59,23 +77,12 @@ class Dilemma:
         if debug:
             print(debug_string1 + "vs. " + debug_string2)
 
-        if decision1 is True:
-            if decision2 is True:
-                self.score1 += self.payoff_matrix[0, 0]
-                self.score2 += self.payoff_matrix[0, 1]
-            else:
-                self.score1 += self.payoff_matrix[1, 0]
-                self.score2 += self.payoff_matrix[1, 1]
-        else:
-            if decision2 is True:
-                self.score1 += self.payoff_matrix[2, 0]
-                self.score2 += self.payoff_matrix[2, 1]
-            else:
-                self.score1 += self.payoff_matrix[3, 0]
-                self.score2 += self.payoff_matrix[3, 1]
+        payoff1, payoff2 = self.game.payoff(self.game.action_index(decision1), self.game.action_index(decision2))
+        self.score1 += payoff1
+        self.score2 += payoff2
 
-        self.history1.append(bool(decision1))
-        self.history2.append(bool(decision2))
+        self.history1.append(decision1)
+        self.history2.append(decision2)
 
     def run(self, debug: bool = False) -> (int, int):
         """
@@ -90,21 +97,14 @@ class Dilemma:
         return math.floor(10*self.score1/self.rounds), math.floor(10*self.score2/self.rounds)
 
 
-def compute_score(payoff_matrix: np.ndarray, own_action: bool, opponent_action: bool) -> (int, int):
+def compute_score(payoff_matrix: Union[np.ndarray, MatrixGame], own_action: Union[bool, int],
+                  opponent_action: Union[bool, int]) -> (int, int):
     """
     Computes the score based on the payoff matrix and action of both players.
-    :param payoff_matrix: Payoff matrix of the prisoner's dilemma
+    :param payoff_matrix: Payoff matrix of the game (or an already compiled game)
     :param own_action: Own action
     :param opponent_action: Opponent's action
     :return: Own score, opponent score
     """
-    if own_action is True:
-        if opponent_action is True:
-            return payoff_matrix[0, 0], payoff_matrix[0, 1]
-        else:
-            return payoff_matrix[1, 0], payoff_matrix[1, 1]
-    else:
-        if opponent_action is True:
-            return payoff_matrix[2, 0], payoff_matrix[2, 1]
-        else:
-            return payoff_matrix[3, 0], payoff_matrix[3, 1]
\ No newline at end of file
+    game: MatrixGame = compile_game(payoff_matrix)
+    return game.payoff(game.action_index(own_action), game.action_index(opponent_action))
@@ -0,0 +1,369 @@
+import argparse
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from multiprocessing import Process
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from simulation import Simulation
+
+
+class WorkQueue:
+    """
+    Directory-based work queue for running simulation sweeps on many nodes sharing a filesystem.
+
+    Layout of the queue directory:
+        tasks/<task_id>.json - task description, written by the coordinator
+        claims/<task_id>.<generation>.claim - claim of a worker, created atomically; its modification time is the
+            heartbeat. A stale claim is taken over by creating the next generation, so only one worker can win it,
+            and the claim of the highest generation is the one that owns the task
+        results/<task_id>.json - result shard, written atomically by the worker that ran the task
+        errors/<task_id>.json - failure record of a task that raised, with the traceback; the task is not retried
+            until the record is deleted
+    """
+    def __init__(self, directory: str, timeout: float = 600.0, poll_interval: float = 1.0) -> None:
+        """
+        Constructor of the work queue
+        :param directory: Queue directory (on the shared filesystem)
+        :param timeout: Seconds without a heartbeat after which a claimed task is considered abandoned and reclaimed
+        :param poll_interval: Seconds a worker waits before looking for work again when all tasks are claimed
+        """
+        self.directory: str = directory
+        self.timeout: float = timeout
+        self.poll_interval: float = poll_interval
+        # Generations of the claims made by this worker, {task id, generation}
+        self.claimed: Dict[str, int] = {}
+        self.tasks_directory: str = os.path.join(directory, 'tasks')
+        self.claims_directory: str = os.path.join(directory, 'claims')
+        self.results_directory: str = os.path.join(directory, 'results')
+        self.errors_directory: str = os.path.join(directory, 'errors')
+        for path in (self.tasks_directory, self.claims_directory, self.results_directory, self.errors_directory):
+            os.makedirs(path, exist_ok=True)
+
+    def task_path(self, task_id: str) -> str:
+        return os.path.join(self.tasks_directory, task_id + '.json')
+
+    def claim_path(self, task_id: str, generation: int) -> str:
+        return os.path.join(self.claims_directory, task_id + '.' + str(generation) + '.claim')
+
+    def claim_generations(self, task_id: str) -> List[int]:
+        """
+        :return: Sorted list of the generations of the existing claims of the task
+        """
+        prefix: str = task_id + '.'
+        return sorted(int(file_name[len(prefix):-len('.claim')]) for file_name in os.listdir(self.claims_directory)
+                      if file_name.startswith(prefix) and file_name.endswith('.claim'))
+
+    def result_path(self, task_id: str) -> str:
+        return os.path.join(self.results_directory, task_id + '.json')
+
+    def error_path(self, task_id: str) -> str:
+        return os.path.join(self.errors_directory, task_id + '.json')
+
+    def write_json(self, path: str, content: Dict) -> None:
+        """
+        Writes the file atomically, so that readers never see a partial file
+        """
+        temporary_path: str = path + '.' + uuid.uuid4().hex + '.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(content, file)
+        os.replace(temporary_path, path)
+
+    def read_json(self, path: str) -> Dict:
+        with open(path) as file:
+            return json.load(file)
+
+    def submit(self, configurations: Dict[str, Dict], iterations: int, chunk_size: int, seed: int = 0) -> List[str]:
+        """
+        Coordinator - splits the sweep into tasks (configuration x iteration range x seed) and writes them to the queue.
+        Every task runs its own simulation object, so the machine learning strategy only learns within a task.
+        :param configurations: Dictionary of configurations (configuration name, keyword arguments of the Simulation
+            constructor - players, error and optionally turns_min, turns_max, mode, payoff_matrix as a nested list)
+        :param iterations: Number of iterations of every configuration
+        :param chunk_size: Number of iterations per task
+        :param seed: Base seed, each task is seeded with seed + task number
+        :return: List of task ids
+        """
+        task_ids: List[str] = []
+        for name, configuration in configurations.items():
+            for start in range(0, iterations, chunk_size):
+                task_id: str = '{:06d}'.format(len(task_ids))
+                self.write_json(self.task_path(task_id), {
+                    'task_id': task_id,
+                    'name': name,
+                    'configuration': configuration,
+                    'start': start,
+                    'stop': min(start + chunk_size, iterations),
+                    'seed': seed + len(task_ids)
+                })
+                task_ids.append(task_id)
+        return task_ids
+
+    def task_ids(self) -> List[str]:
+        return sorted(file_name[:-len('.json')] for file_name in os.listdir(self.tasks_directory)
+                      if file_name.endswith('.json'))
+
+    def pending(self) -> List[str]:
+        """
+        :return: List of ids of the tasks that have neither a result nor a failure record yet
+        """
+        return [task_id for task_id in self.task_ids() if not os.path.exists(self.result_path(task_id))
+                and not os.path.exists(self.error_path(task_id))]
+
+    def failed(self) -> Dict[str, Dict]:
+        """
+        :return: Dictionary of the failure records of the tasks that raised, {task id, failure record}
+        """
+        return {task_id: self.read_json(self.error_path(task_id)) for task_id in self.task_ids()
+                if os.path.exists(self.error_path(task_id)) and not os.path.exists(self.result_path(task_id))}
+
+    def claim(self, task_id: str, worker_id: str) -> bool:
+        """
+        Atomically claims the task. A claim without a heartbeat for longer than the timeout is taken over
+        by creating the claim of the next generation, the superseded claims are removed.
+        :param task_id: Task id
+        :param worker_id: Id of the claiming worker
+        :return: True if the task has been claimed by this worker
+        """
+        generations: List[int] = self.claim_generations(task_id)
+        generation: int = 0
+        if len(generations) > 0:
+            try:
+                age: float = time.time() - os.path.getmtime(self.claim_path(task_id, generations[-1]))
+            except FileNotFoundError:
+                return False
+            if age <= self.timeout:
+                return False
+            generation = generations[-1] + 1
+
+        # Of all workers that found the same stale claim, only one creates the next generation
+        try:
+            descriptor: int = os.open(self.claim_path(task_id, generation), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(worker_id)
+        self.claimed[task_id] = generation
+
+        for old_generation in generations:
+            try:
+                os.remove(self.claim_path(task_id, old_generation))
+            except FileNotFoundError:
+                pass
+
+        # The task may have been completed between listing the pending tasks and claiming it
+        if os.path.exists(self.result_path(task_id)):
+            self.release(task_id, worker_id)
+            return False
+        return True
+
+    def owns(self, task_id: str, worker_id: str) -> bool:
+        """
+        :return: True if the worker holds the claim of the task, i.e. it has not been taken over
+        """
+        generation: Optional[int] = self.claimed.get(task_id)
+        if generation is None:
+            return False
+        try:
+            if self.claim_generations(task_id)[-1] != generation:
+                return False
+            with open(self.claim_path(task_id, generation)) as file:
+                return file.read() == worker_id
+        except (IndexError, FileNotFoundError):
+            return False
+
+    def heartbeat(self, task_id: str, worker_id: str) -> bool:
+        """
+        Refreshes the claim of the task
+        :return: True if the worker still holds the claim
+        """
+        if not self.owns(task_id, worker_id):
+            return False
+        try:
+            os.utime(self.claim_path(task_id, self.claimed[task_id]))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def keep_alive(self, task_id: str, worker_id: str, stop: threading.Event) -> None:
+        """
+        Heartbeats the claim from a background thread until stopped or taken over,
+        so that long iterations are not mistaken for a crashed worker
+        """
+        while not stop.wait(self.timeout / 4):
+            if not self.heartbeat(task_id, worker_id):
+                return
+
+    def release(self, task_id: str, worker_id: str) -> None:
+        """
+        Removes the claim of the worker. The claim of another worker that took the task over is never removed.
+        """
+        generation: Optional[int] = self.claimed.pop(task_id, None)
+        if generation is None:
+            return
+        claim_path: str = self.claim_path(task_id, generation)
+        try:
+            with open(claim_path) as file:
+                if file.read() != worker_id:
+                    return
+            os.remove(claim_path)
+        except FileNotFoundError:
+            pass
+
+    def run_task(self, task: Dict, worker_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Runs the simulations of a single task
+        :param task: Task description
+        :param worker_id: Id of the worker holding the claim - the task is abandoned once the claim is taken over
+        :return: Result shard - task id, configuration name, number of iterations and summed standings,
+            or None if the task was abandoned
+        """
+        random.seed(task['seed'])
+        np.random.seed(task['seed'])
+
+        configuration: Dict = dict(task['configuration'])
+        if 'payoff_matrix' in configuration:
+            configuration['payoff_matrix'] = np.array(configuration['payoff_matrix'])
+        configuration.setdefault('turns_min', 10)
+        configuration.setdefault('turns_max', 25)
+        simulation: Simulation = Simulation(**configuration)
+
+        standings: Dict[str, int] = {}
+        for i in range(task['start'], task['stop']):
+            result = simulation.simulate()
+            for name, score in result.items():
+                standings[name] = standings.get(name, 0) + int(score)
+            for player in simulation.players:
+                player.score = 0
+            if worker_id is not None and not self.owns(task['task_id'], worker_id):
+                return None
+
+        return {
+            'task_id': task['task_id'],
+            'name': task['name'],
+            'iterations': task['stop'] - task['start'],
+            'standings': standings
+        }
+
+    def work(self, worker_id: Optional[str] = None) -> int:
+        """
+        Worker - claims and runs tasks until every task of the queue has a result or a failure record.
+        A task that raises gets a failure record and its claim is released, so it does not bring down other workers.
+        :param worker_id: Id of the worker, host name and process id by default
+        :return: Number of tasks run successfully by this worker
+        """
+        if worker_id is None:
+            worker_id = socket.gethostname() + ':' + str(os.getpid())
+
+        completed: int = 0
+        while True:
+            pending: List[str] = self.pending()
+            if len(pending) == 0:
+                return completed
+
+            claimed: bool = False
+            for task_id in pending:
+                if not self.claim(task_id, worker_id):
+                    continue
+                claimed = True
+                stop: threading.Event = threading.Event()
+                heartbeat: threading.Thread = threading.Thread(target=self.keep_alive,
+                                                               args=(task_id, worker_id, stop), daemon=True)
+                heartbeat.start()
+                error: Optional[str] = None
+                try:
+                    result: Optional[Dict] = self.run_task(self.read_json(self.task_path(task_id)), worker_id)
+                except Exception:
+                    result = None
+                    error = traceback.format_exc()
+                finally:
+                    stop.set()
+                    heartbeat.join()
+                if error is not None:
+                    if self.owns(task_id, worker_id):
+                        self.write_json(self.error_path(task_id), {'task_id': task_id, 'worker_id': worker_id,
+                                                                   'error': error})
+                    self.release(task_id, worker_id)
+                    continue
+                if result is None:
+                    continue
+                self.write_json(self.result_path(task_id), result)
+                self.release(task_id, worker_id)
+                completed += 1
+
+            if not claimed:
+                time.sleep(self.poll_interval)
+
+    def merge(self, partial: bool = False) -> Dict[str, Dict[str, int]]:
+        """
+        Aggregates the result shards
+        :param partial: If true - merge the finished tasks even if some are still pending or have failed
+        :return: Dictionary of configurations (configuration name, standings summed over all finished iterations)
+        :raises RuntimeError: if some tasks are pending or have failed (unless partial)
+        """
+        if not partial:
+            pending: List[str] = self.pending()
+            failed: List[str] = list(self.failed().keys())
+            if len(pending) > 0 or len(failed) > 0:
+                raise RuntimeError('Incomplete queue - pending tasks: ' + str(pending) + ', failed tasks: ' + str(failed))
+
+        merged: Dict[str, Dict[str, int]] = {}
+        for task_id in self.task_ids():
+            if not os.path.exists(self.result_path(task_id)):
+                continue
+            result: Dict = self.read_json(self.result_path(task_id))
+            standings: Dict[str, int] = merged.setdefault(result['name'], {})
+            for name, score in result['standings'].items():
+                standings[name] = standings.get(name, 0) + score
+
+        for name, standings in merged.items():
+            merged[name] = dict(sorted(standings.items(), key=lambda item: item[1], reverse=True))
+        return merged
+
+
+def work(directory: str, timeout: float = 600.0) -> None:
+    WorkQueue(directory, timeout).work()
+
+
+def run_local(directory: str, workers: int, timeout: float = 600.0) -> Dict[str, Dict[str, int]]:
+    """
+    Runs the queued tasks with several worker processes on this machine
+    :param directory: Queue directory
+    :param workers: Number of worker processes
+    :param timeout: Heartbeat timeout of the claims
+    :return: Merged standings
+    :raises RuntimeError: if a worker process exited with an error, or some tasks are pending or have failed
+    """
+    processes: List[Process] = [Process(target=work, args=(directory, timeout)) for i in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    exit_codes: List[int] = [process.exitcode for process in processes]
+    if any(exit_code != 0 for exit_code in exit_codes):
+        raise RuntimeError('Worker processes exited with codes ' + str(exit_codes))
+    return WorkQueue(directory, timeout).merge()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Distributed simulation work queue')
+    parser.add_argument('command', choices=['work', 'merge'])
+    parser.add_argument('directory', help='Queue directory on the shared filesystem')
+    parser.add_argument('--timeout', type=float, default=600.0, help='Heartbeat timeout of the claims in seconds')
+    parser.add_argument('--partial', action='store_true', help='Merge even if some tasks are pending or have failed')
+    arguments = parser.parse_args()
+
+    if arguments.command == 'work':
+        work(arguments.directory, arguments.timeout)
+    else:
+        queue: WorkQueue = WorkQueue(arguments.directory, arguments.timeout)
+        for task_id, failure in queue.failed().items():
+            print("Task " + task_id + " failed:\n" + failure['error'])
+        print(queue.merge(arguments.partial))
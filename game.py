@@ -0,0 +1,141 @@
+import math
+from typing import List, Dict, Tuple, Union
+
+import numpy as np
+
+'''
+Payoff matrices of two-player, k-action matrix games.
+
+Each matrix has k*k rows, one per pair of actions, ordered by (action1 * k + action2), and two columns:
+payoff of player 1 and payoff of player 2. Action 0 is cooperate, action 1 is defect,
+so the prisoner's dilemma keeps the [ [coop, coop], [coop, deflect], [deflect, coop], [deflect, deflect] ] layout.
+'''
+
+PRISONERS_DILEMMA: np.ndarray = np.array([[2, 2], [-1, 3], [3, -1], [0, 0]])
+STAG_HUNT: np.ndarray = np.array([[3, 3], [0, 2], [2, 0], [1, 1]])
+CHICKEN: np.ndarray = np.array([[0, 0], [-1, 1], [1, -1], [-10, -10]])
+SNOWDRIFT: np.ndarray = np.array([[3, 3], [1, 5], [5, 1], [0, 0]])
+# Cooperate, defect or abstain (loner) - abstaining yields a small fixed payoff to both players
+OPTIONAL_PRISONERS_DILEMMA: np.ndarray = np.array([[2, 2], [-1, 3], [1, 1],
+                                                   [3, -1], [0, 0], [1, 1],
+                                                   [1, 1], [1, 1], [1, 1]])
+
+
+class MatrixGame:
+    """
+    Two-player, k-action matrix game with payoffs precompiled into a flat lookup, indexed by action1 * k + action2
+    """
+    def __init__(self, payoff_matrix: np.ndarray):
+        """
+        Constructor for the matrix game
+        :param payoff_matrix: Payoff matrix of k*k rows (action1 * k + action2) and 2 columns (player 1, player 2)
+        :raises ValueError: if the payoff matrix does not describe a square two-player game
+        """
+        # Own read-only copy, so that later edits of the caller's array cannot make the compiled lookups stale
+        payoff_matrix = np.array(payoff_matrix)
+        payoff_matrix.setflags(write=False)
+        actions: int = math.isqrt(payoff_matrix.shape[0])
+        if payoff_matrix.ndim != 2 or payoff_matrix.shape[1] != 2 or actions * actions != payoff_matrix.shape[0]:
+            raise ValueError('Invalid payoff matrix shape.')
+
+        self.payoff_matrix: np.ndarray = payoff_matrix
+        self.actions: int = actions
+        # Native ints for the scalar path, arrays for the batch path
+        self.payoffs1: List[int] = payoff_matrix[:, 0].tolist()
+        self.payoffs2: List[int] = payoff_matrix[:, 1].tolist()
+        self.payoffs1_array: np.ndarray = payoff_matrix[:, 0].copy()
+        self.payoffs2_array: np.ndarray = payoff_matrix[:, 1].copy()
+
+    def action_index(self, decision: Union[bool, int]) -> int:
+        """
+        Converts a strategy decision into an action index
+        :param decision: True - cooperate / False - defect, or an action index for games with more actions
+        :return: Action index (0 - cooperate, 1 - defect)
+        """
+        if decision is True:
+            return 0
+        if decision is False:
+            return 1
+        return int(decision)
+
+    def decision(self, action: int) -> Union[bool, int]:
+        """
+        Converts an action index into the decision stored in the histories read by the strategies
+        :param action: Action index
+        :return: True - cooperate / False - defect, or the action index for any further action
+        """
+        if action == 0:
+            return True
+        if action == 1:
+            return False
+        return action
+
+    def payoff(self, action1: int, action2: int) -> Tuple[int, int]:
+        """
+        Scalar payoff lookup
+        :param action1: Action index of player 1
+        :param action2: Action index of player 2
+        :return: Score of player 1, score of player 2
+        """
+        index: int = action1 * self.actions + action2
+        return self.payoffs1[index], self.payoffs2[index]
+
+    def payoffs(self, actions1: np.ndarray, actions2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batch payoff lookup
+        :param actions1: Array of action indices of player 1
+        :param actions2: Array of action indices of player 2
+        :return: Array of scores of player 1, array of scores of player 2
+        """
+        index: np.ndarray = np.asarray(actions1) * self.actions + np.asarray(actions2)
+        return self.payoffs1_array[index], self.payoffs2_array[index]
+
+
+_compiled_games: Dict[Tuple[str, Tuple[int, ...], bytes], MatrixGame] = {}
+# The same games keyed by the identity of their own read-only payoff matrix (the one Dilemma passes to the strategies)
+# - the game keeps the matrix alive, so the id stays valid, and the matrix cannot change
+_compiled_games_by_id: Dict[int, MatrixGame] = {}
+
+
+def compile_game(payoff_matrix: Union[np.ndarray, MatrixGame]) -> MatrixGame:
+    """
+    Returns the matrix game for the given payoff matrix, reusing already compiled games.
+    Any other array is looked up by its current contents, so editing it in place is picked up.
+    :param payoff_matrix: Payoff matrix or an already compiled game
+    :return: Matrix game
+    """
+    game: MatrixGame = _compiled_games_by_id.get(id(payoff_matrix))
+    if game is not None and game.payoff_matrix is payoff_matrix:
+        return game
+    if isinstance(payoff_matrix, MatrixGame):
+        return payoff_matrix
+    payoff_matrix = np.asarray(payoff_matrix)
+    key: Tuple[str, Tuple[int, ...], bytes] = (payoff_matrix.dtype.str, payoff_matrix.shape, payoff_matrix.tobytes())
+    try:
+        return _compiled_games[key]
+    except KeyError:
+        game = MatrixGame(payoff_matrix)
+        _compiled_games[key] = game
+        _compiled_games_by_id[id(game.payoff_matrix)] = game
+        return game
+
+
+def get_game(name: str) -> MatrixGame:
+    """
+    Returns the matrix game from the game name
+    :param name: Game name
+    :return: Matrix game
+    :raises ValueError: if invalid game name was given.
+    """
+    if name == 'prisoners_dilemma':
+        return compile_game(PRISONERS_DILEMMA)
+    if name == 'stag_hunt':
+        return compile_game(STAG_HUNT)
+    if name == 'chicken':
+        return compile_game(CHICKEN)
+    if name == 'snowdrift':
+        return compile_game(SNOWDRIFT)
+    if name == 'optional_prisoners_dilemma':
+        return compile_game(OPTIONAL_PRISONERS_DILEMMA)
+
+    raise ValueError('Invalid game name.')
@@ -0,0 +1,361 @@
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+
+import strategy
+from game import MatrixGame, compile_game
+
+'''
+Batch versions of the bundled strategies, playing a whole batch of games at once.
+
+Histories are arrays of action indices (0 - cooperate, 1 - defect) of shape (games, turn).
+
+Parameter scheme:
+    :param turn: Current turn number
+    :param own_history: History of own moves
+    :param opponent_history: History of opponent moves
+    :param game: Matrix game of the simulation
+    :param rng: Random number generator
+    :return: Array of actions, one per game
+'''
+
+
+def batch_always_cooperate(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                           rng: np.random.Generator) -> np.ndarray:
+    """
+    Cooperates every turn.
+    """
+    return np.zeros(own_history.shape[0], dtype=np.int8)
+
+def batch_always_defect(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                        rng: np.random.Generator) -> np.ndarray:
+    """
+    Defects every turn.
+    """
+    return np.ones(own_history.shape[0], dtype=np.int8)
+
+def batch_tit_for_tat(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                      rng: np.random.Generator) -> np.ndarray:
+    """
+    Cooperates first, then copies the opponent's last move.
+    """
+    if turn == 0:
+        return np.zeros(own_history.shape[0], dtype=np.int8)
+    return opponent_history[:, -1].copy()
+
+def batch_grudger(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                  rng: np.random.Generator) -> np.ndarray:
+    """
+    Cooperates until the opponent defects once, then defects forever.
+    """
+    return opponent_history.any(axis=1).astype(np.int8)
+
+def batch_pick_random(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                      rng: np.random.Generator) -> np.ndarray:
+    """
+    Cooperates or defects with equal probability.
+    """
+    return (rng.random(own_history.shape[0]) >= 0.5).astype(np.int8)
+
+def batch_sus_tit_for_tat(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                          rng: np.random.Generator) -> np.ndarray:
+    """
+    Defects first, then copies the opponent's last move.
+    """
+    if turn == 0:
+        return np.ones(own_history.shape[0], dtype=np.int8)
+    return opponent_history[:, -1].copy()
+
+def batch_tit_for_two_tats(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                           rng: np.random.Generator) -> np.ndarray:
+    """
+    Defects only after two consecutive defections of the opponent.
+    """
+    if turn < 2:
+        return np.zeros(own_history.shape[0], dtype=np.int8)
+    return opponent_history[:, -1] & opponent_history[:, -2]
+
+def batch_two_tits_for_tat(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                           rng: np.random.Generator) -> np.ndarray:
+    """
+    Defects twice after every defection of the opponent.
+    """
+    if turn == 0:
+        return np.zeros(own_history.shape[0], dtype=np.int8)
+    if turn == 1:
+        return opponent_history[:, -1].copy()
+    return opponent_history[:, -1] | opponent_history[:, -2]
+
+def batch_pavlov(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                 rng: np.random.Generator) -> np.ndarray:
+    """
+    Repeats its last move if both players made the same move, switches otherwise.
+    """
+    if turn == 0:
+        return np.zeros(own_history.shape[0], dtype=np.int8)
+    return (opponent_history[:, -1] != own_history[:, -1]).astype(np.int8)
+
+def batch_detective(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                    rng: np.random.Generator) -> np.ndarray:
+    """
+    Opens with cooperate, defect, cooperate, cooperate, then always defects if cheated in the opening, cooperates otherwise.
+    """
+    if turn < 4:
+        return np.full(own_history.shape[0], 1 if turn == 1 else 0, dtype=np.int8)
+    return opponent_history[:, :4].any(axis=1).astype(np.int8)
+
+def batch_simpleton(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                    rng: np.random.Generator) -> np.ndarray:
+    """
+    Repeats its last move if it earned points, switches otherwise.
+    """
+    if turn == 0:
+        return np.zeros(own_history.shape[0], dtype=np.int8)
+    own_payoff: np.ndarray = game.payoffs(own_history[:, -1], opponent_history[:, -1])[0]
+    # Same rule as strategy.simpleton - after a mutual defection, any nonzero payoff counts as earned
+    mutual_defection: np.ndarray = (own_history[:, -1] == 1) & (opponent_history[:, -1] == 1)
+    earned: np.ndarray = np.where(mutual_defection, own_payoff != 0, own_payoff > 0)
+    return np.where(earned, own_history[:, -1], 1 - own_history[:, -1]).astype(np.int8)
+
+def batch_coop_75(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                  rng: np.random.Generator) -> np.ndarray:
+    """
+    Cooperates with .75 probability.
+    """
+    return (rng.random(own_history.shape[0]) >= 0.75).astype(np.int8)
+
+def batch_retaliate_75(turn: int, own_history: np.ndarray, opponent_history: np.ndarray, game: MatrixGame,
+                       rng: np.random.Generator) -> np.ndarray:
+    """
+    Cooperates, unless cheated - then retaliates with .75 probability.
+    """
+    if turn == 0:
+        return np.zeros(own_history.shape[0], dtype=np.int8)
+    return (opponent_history[:, -1] & (rng.random(own_history.shape[0]) < 0.75)).astype(np.int8)
+
+
+def get_batch_strategy(name: str):
+    """
+    Returns the batch strategy function pointer from the strategy name
+    :param name: Strategy name
+    :return: Function pointer to a specific batch strategy
+    :raises ValueError: if invalid strategy name was given, or the strategy has no batch version (machine learning).
+    """
+    if name == 'always_cooperate':
+        return batch_always_cooperate
+    if name == 'always_defect':
+        return batch_always_defect
+    if name == 'tit_for_tat':
+        return batch_tit_for_tat
+    if name == 'grudger':
+        return batch_grudger
+    if name == 'pick_random':
+        return batch_pick_random
+    if name == 'sus_tit_for_tat':
+        return batch_sus_tit_for_tat
+    if name == 'tit_for_two_tats':
+        return batch_tit_for_two_tats
+    if name == 'two_tits_for_tat':
+        return batch_two_tits_for_tat
+    if name == 'pavlov':
+        return batch_pavlov
+    if name == 'detective':
+        return batch_detective
+    if name == 'simpleton':
+        return batch_simpleton
+    if name == 'coop_75':
+        return batch_coop_75
+    if name == 'retaliate_75':
+        return batch_retaliate_75
+
+    raise ValueError('Invalid batch strategy name.')
+
+
+BATCH_STRATEGIES: List[str] = ['always_cooperate', 'always_defect', 'tit_for_tat', 'grudger', 'pick_random',
+                               'sus_tit_for_tat', 'tit_for_two_tats', 'two_tits_for_tat', 'pavlov', 'detective',
+                               'simpleton', 'coop_75', 'retaliate_75']
+
+
+class GeneticSearch:
+    """
+    Genetic search over memory-n lookup table strategies.
+
+    Each candidate is a row of the genome array: memory opening actions followed by 4^memory responses
+    (see strategy.lookup_table_strategy_model for the state encoding). All candidates are evaluated
+    against the bundled strategies at once, as arrays.
+    """
+    def __init__(self, memory: int = 1, population: int = 100, opponents: Optional[List[str]] = None,
+                 turns_min: int = 10, turns_max: int = 25, error: float = 0, games: int = 1,
+                 mutation_rate: float = 0.01, crossover_rate: float = 0.7, elite: int = 2, tournament_size: int = 3,
+                 payoff_matrix: np.ndarray = np.array([[2, 2], [-1, 3], [3, -1], [0, 0]]),
+                 seed: Optional[int] = None) -> None:
+        """
+        Constructor of the genetic search
+        :param memory: Number of turns the candidates remember
+        :param population: Number of candidates per generation
+        :param opponents: Names of the strategies the candidates are evaluated against (all batch strategies by default)
+        :param turns_min: Minimum number of turns per game
+        :param turns_max: Maximum number of turns per game
+        :param error: Error chance
+        :param games: Number of games of every candidate against every opponent per generation
+        :param mutation_rate: Chance of flipping each action of the offspring
+        :param crossover_rate: Chance of uniform crossover of two parents (otherwise the first parent is copied)
+        :param elite: Number of best candidates copied unchanged into the next generation
+        :param tournament_size: Number of candidates competing in each tournament selection
+        :param payoff_matrix: Payoff matrix of a two-action game
+        :param seed: Seed of the random number generator
+        :raises ValueError: if the payoff matrix is not a two-action game
+        """
+        self.game: MatrixGame = compile_game(payoff_matrix)
+        if self.game.actions != 2:
+            raise ValueError('Lookup table strategies require a two-action game.')
+        self.memory: int = memory
+        self.population: int = population
+        self.opponents: List[str] = list(BATCH_STRATEGIES) if opponents is None else opponents
+        self.turns_min: int = turns_min
+        self.turns_max: int = turns_max
+        self.error: float = error
+        self.games: int = games
+        self.mutation_rate: float = mutation_rate
+        self.crossover_rate: float = crossover_rate
+        self.elite: int = elite
+        self.tournament_size: int = tournament_size
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        self.genome_length: int = memory + 4 ** memory
+        self.genomes: np.ndarray = self.rng.integers(0, 2, size=(population, self.genome_length), dtype=np.int8)
+        self.fitnesses: np.ndarray = np.zeros(population)
+
+    def decide(self, genomes: np.ndarray, turn: int, own_history: np.ndarray, opponent_history: np.ndarray) -> np.ndarray:
+        """
+        Looks up the actions of the candidates
+        :param genomes: Genome array, one row per game
+        :param turn: Current turn number
+        :param own_history: History of own moves, shape (games, turn)
+        :param opponent_history: History of opponent moves, shape (games, turn)
+        :return: Array of actions, one per game
+        """
+        if turn < self.memory:
+            return genomes[:, turn]
+        state: np.ndarray = np.zeros(genomes.shape[0], dtype=np.int64)
+        for j in range(self.memory):
+            state |= own_history[:, -1 - j].astype(np.int64) << j
+            state |= opponent_history[:, -1 - j].astype(np.int64) << (self.memory + j)
+        return genomes[np.arange(genomes.shape[0]), self.memory + state]
+
+    def play(self, genomes: np.ndarray, opponent: str) -> np.ndarray:
+        """
+        Plays one game of every genome against the opponent
+        :param genomes: Genome array
+        :param opponent: Opponent strategy name
+        :return: Scores of the genomes, normalized like Dilemma.run (10 * score / rounds)
+        """
+        opponent_strategy = get_batch_strategy(opponent)
+        count: int = genomes.shape[0]
+        rounds: np.ndarray = self.rng.integers(self.turns_min, self.turns_max + 1, size=count)
+        turns: int = int(rounds.max())
+        history1: np.ndarray = np.zeros((count, turns), dtype=np.int8)
+        history2: np.ndarray = np.zeros((count, turns), dtype=np.int8)
+        score: np.ndarray = np.zeros(count, dtype=np.int64)
+
+        for turn in range(turns):
+            decision1: np.ndarray = self.decide(genomes, turn, history1[:, :turn], history2[:, :turn])
+            decision2: np.ndarray = opponent_strategy(turn, history2[:, :turn], history1[:, :turn], self.game, self.rng)
+            if self.error > 0:
+                decision1 = decision1 ^ (self.rng.random(count) <= self.error)
+                decision2 = decision2 ^ (self.rng.random(count) <= self.error)
+            history1[:, turn] = decision1
+            history2[:, turn] = decision2
+            score += np.where(turn < rounds, self.game.payoffs(decision1, decision2)[0], 0)
+
+        return 10 * score / rounds
+
+    def evaluate(self, genomes: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the genomes against every opponent
+        :param genomes: Genome array
+        :return: Mean normalized score of every genome
+        """
+        repeated: np.ndarray = np.repeat(genomes, self.games, axis=0)
+        total: np.ndarray = np.zeros(genomes.shape[0])
+        for opponent in self.opponents:
+            total += self.play(repeated, opponent).reshape(genomes.shape[0], self.games).mean(axis=1)
+        return total / len(self.opponents)
+
+    def select(self, count: int) -> np.ndarray:
+        """
+        Tournament selection
+        :param count: Number of selected candidates
+        :return: Indices of the selected candidates
+        """
+        entrants: np.ndarray = self.rng.integers(0, self.population, size=(count, self.tournament_size))
+        return entrants[np.arange(count), self.fitnesses[entrants].argmax(axis=1)]
+
+    def step(self) -> np.ndarray:
+        """
+        Evaluates the current generation and breeds the next one
+        :return: Fitnesses of the evaluated generation
+        """
+        fitnesses: np.ndarray = self.evaluate(self.genomes)
+        self.fitnesses = fitnesses
+        order: np.ndarray = np.argsort(-self.fitnesses, kind='stable')
+        offspring_count: int = self.population - self.elite
+
+        parents1: np.ndarray = self.genomes[self.select(offspring_count)]
+        parents2: np.ndarray = self.genomes[self.select(offspring_count)]
+        crossover: np.ndarray = ((self.rng.random(offspring_count) < self.crossover_rate)[:, None]
+                                 & (self.rng.random((offspring_count, self.genome_length)) < 0.5))
+        offspring: np.ndarray = np.where(crossover, parents2, parents1)
+        offspring ^= (self.rng.random(offspring.shape) < self.mutation_rate).astype(np.int8)
+
+        elite: np.ndarray = self.genomes[order[:self.elite]]
+        self.genomes = np.concatenate([elite, offspring])
+        # Fitness of the offspring is unknown until the next evaluation
+        self.fitnesses = np.concatenate([fitnesses[order[:self.elite]], np.zeros(offspring_count)])
+        return fitnesses
+
+    def run(self, generations: int, debug: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Runs the search
+        :param generations: Number of generations
+        :param debug: If true - print the best and mean fitness of every generation
+        :return: Genomes and fitnesses of the final generation, best first
+        """
+        for i in range(generations):
+            fitnesses: np.ndarray = self.step()
+            if debug:
+                print("Generation #" + str(i + 1) + ": best " + str(fitnesses.max()) + ", mean " + str(fitnesses.mean()))
+
+        self.fitnesses = self.evaluate(self.genomes)
+        order: np.ndarray = np.argsort(-self.fitnesses, kind='stable')
+        self.genomes = self.genomes[order]
+        self.fitnesses = self.fitnesses[order]
+        return self.genomes, self.fitnesses
+
+    def to_strategy(self, genome: np.ndarray) -> strategy.lookup_table_strategy_model:
+        """
+        Converts the genome into a strategy usable by the players
+        :param genome: Genome of a single candidate
+        :return: Lookup table strategy model
+        """
+        return strategy.lookup_table_strategy_model(genome[self.memory:].tolist(), genome[:self.memory].tolist(),
+                                                    self.memory)
+
+    def register(self, count: int = 1, prefix: str = 'evolved') -> List[str]:
+        """
+        Registers the best distinct candidates of the current generation as strategies
+        :param count: Number of strategies to register
+        :param prefix: Name prefix of the strategies - <prefix>_1, <prefix>_2, ...
+        :return: Names of the registered strategies
+        """
+        names: List[str] = []
+        seen: Dict[bytes, bool] = {}
+        for genome in self.genomes[np.argsort(-self.fitnesses, kind='stable')]:
+            if len(names) == count:
+                break
+            if genome.tobytes() in seen:
+                continue
+            seen[genome.tobytes()] = True
+            name: str = prefix + '_' + str(len(names) + 1)
+            strategy.register_strategy(name, self.to_strategy(genome).lookup_table)
+            names.append(name)
+        return names
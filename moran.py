@@ -0,0 +1,193 @@
+import math
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+
+import strategy
+from dilemma import Dilemma
+from game import MatrixGame, compile_game
+from player import Player
+
+
+class FixationEstimator:
+    """
+    Estimates invasion and fixation probabilities of a mutant strategy in a population of a resident strategy.
+
+    Every player meets every other player once per generation, so the payoff of a player is the mean of the
+    type-vs-type payoffs (cached averages of Dilemma results) over the rest of the population.
+    Fitness is exp(intensity * payoff); it is handled in log space, so strong selection does not overflow.
+    Thousands of independent trajectories run together, as arrays.
+    """
+    def __init__(self, turns_min: int = 10, turns_max: int = 25, error: float = 0, games: int = 50,
+                 payoff_matrix: np.ndarray = np.array([[2, 2], [-1, 3], [3, -1], [0, 0]]),
+                 seed: Optional[int] = None) -> None:
+        """
+        Constructor of the fixation estimator
+        :param turns_min: Minimum number of turns per game
+        :param turns_max: Maximum number of turns per game
+        :param error: Error chance
+        :param games: Number of Dilemma games averaged into each type-vs-type payoff
+        :param payoff_matrix: Payoff matrix of the game
+        :param seed: Seed of the random number generator of the trajectories
+        """
+        self.turns_min: int = turns_min
+        self.turns_max: int = turns_max
+        self.error: float = error
+        self.games: int = games
+        self.game: MatrixGame = compile_game(payoff_matrix)
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        # payoffs[a, b] - mean score of strategy a in the game against strategy b
+        self.payoffs: Dict[Tuple[str, str], float] = {}
+
+    def payoff(self, strategy1: str, strategy2: str) -> float:
+        """
+        Returns the cached mean score of strategy1 against strategy2, playing the games if needed.
+        Every game uses fresh players, so the machine learning strategy is scored untrained.
+        :param strategy1: Strategy name
+        :param strategy2: Strategy name
+        :return: Mean score of strategy1 (normalized like Dilemma.run)
+        """
+        if (strategy1, strategy2) not in self.payoffs:
+            scores1: List[int] = []
+            scores2: List[int] = []
+            for i in range(self.games):
+                dilemma: Dilemma = Dilemma(self.game, self.turns_min, self.turns_max, self.error,
+                                           Player(strategy.get_strategy(strategy1), strategy1),
+                                           Player(strategy.get_strategy(strategy2), strategy2))
+                result: (int, int) = dilemma.run()
+                scores1.append(result[0])
+                scores2.append(result[1])
+            if strategy1 == strategy2:
+                self.payoffs[strategy1, strategy2] = (sum(scores1) + sum(scores2)) / (2 * self.games)
+            else:
+                self.payoffs[strategy1, strategy2] = sum(scores1) / self.games
+                self.payoffs[strategy2, strategy1] = sum(scores2) / self.games
+        return self.payoffs[strategy1, strategy2]
+
+    def log_fitness(self, mutant: str, resident: str, mutants: np.ndarray, population_size: int,
+                    intensity: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Computes the logarithm of the fitness of both types, i.e. intensity * payoff
+        :param mutant: Mutant strategy name
+        :param resident: Resident strategy name
+        :param mutants: Array of the numbers of mutants, one per trajectory
+        :param population_size: Population size
+        :param intensity: Selection intensity (0 - neutral drift)
+        :return: Log-fitness of a mutant, log-fitness of a resident - one per trajectory
+        """
+        residents: np.ndarray = population_size - mutants
+        payoff_mutant: np.ndarray = ((mutants - 1) * self.payoff(mutant, mutant)
+                                     + residents * self.payoff(mutant, resident)) / (population_size - 1)
+        payoff_resident: np.ndarray = (mutants * self.payoff(resident, mutant)
+                                       + (residents - 1) * self.payoff(resident, resident)) / (population_size - 1)
+        return intensity * payoff_mutant, intensity * payoff_resident
+
+    def fixation_probability(self, mutant: str, resident: str, population_size: int, intensity: float,
+                             trajectories: int = 10000, process: str = 'moran',
+                             initial: int = 1) -> Tuple[float, float]:
+        """
+        Estimates the fixation probability of the mutant by simulating independent trajectories
+        :param mutant: Mutant strategy name
+        :param resident: Resident strategy name
+        :param population_size: Population size
+        :param intensity: Selection intensity
+        :param trajectories: Number of trajectories
+        :param process: Evolutionary dynamics ('moran', 'wright-fisher')
+        :param initial: Initial number of mutants (1 - invasion by a single mutant)
+        :return: Fixation probability and its standard error
+        :raises ValueError: if invalid process, population size or initial number of mutants was given
+        """
+        if process != 'moran' and process != 'wright-fisher':
+            raise ValueError('Invalid evolutionary process.')
+        validate_population(population_size, initial)
+
+        mutants: np.ndarray = np.full(trajectories, initial, dtype=np.int64)
+        active: np.ndarray = (mutants > 0) & (mutants < population_size)
+        while active.any():
+            current: np.ndarray = mutants[active]
+            log_mutant, log_resident = self.log_fitness(mutant, resident, current, population_size, intensity)
+            if process == 'moran':
+                # Birth-death Moran process, skipping the steps that do not change the census:
+                # the census goes up with probability f_A / (f_A + f_B) = 1 / (1 + exp(log f_B - log f_A)),
+                # down otherwise
+                up_probability: np.ndarray = np.exp(-np.logaddexp(0, log_resident - log_mutant))
+                up: np.ndarray = self.rng.random(current.shape[0]) < up_probability
+                mutants[active] = current + np.where(up, 1, -1)
+            else:
+                # Fitness relative to the fitter type, so that the larger one is 1
+                log_maximum: np.ndarray = np.maximum(log_mutant, log_resident)
+                weight_mutant: np.ndarray = current * np.exp(log_mutant - log_maximum)
+                weight_resident: np.ndarray = (population_size - current) * np.exp(log_resident - log_maximum)
+                share: np.ndarray = weight_mutant / (weight_mutant + weight_resident)
+                mutants[active] = self.rng.binomial(population_size, share)
+            active = (mutants > 0) & (mutants < population_size)
+
+        probability: float = float((mutants == population_size).mean())
+        return probability, math.sqrt(probability * (1 - probability) / trajectories)
+
+    def exact_fixation_probability(self, mutant: str, resident: str, population_size: int, intensity: float,
+                                   initial: int = 1) -> float:
+        """
+        Fixation probability of the Moran process, computed analytically
+        :param mutant: Mutant strategy name
+        :param resident: Resident strategy name
+        :param population_size: Population size
+        :param intensity: Selection intensity
+        :param initial: Initial number of mutants
+        :return: Fixation probability
+        :raises ValueError: if invalid population size or initial number of mutants was given
+        """
+        validate_population(population_size, initial)
+        log_mutant, log_resident = self.log_fitness(mutant, resident, np.arange(1, population_size),
+                                                    population_size, intensity)
+        # (1 + sum of the first initial - 1 products of f_B / f_A) / (1 + sum of all of them), in log space
+        log_products: np.ndarray = np.concatenate(([0.0], np.cumsum(log_resident - log_mutant)))
+        return float(np.exp(np.logaddexp.reduce(log_products[:initial]) - np.logaddexp.reduce(log_products)))
+
+    def sweep(self, mutant: str, resident: str, population_sizes: List[int], intensities: List[float],
+              trajectories: int = 10000, process: str = 'moran') -> Dict[Tuple[int, float], Tuple[float, float]]:
+        """
+        Estimates the fixation probability of a single mutant for every population size and selection intensity
+        :param mutant: Mutant strategy name
+        :param resident: Resident strategy name
+        :param population_sizes: List of population sizes
+        :param intensities: List of selection intensities
+        :param trajectories: Number of trajectories per estimate
+        :param process: Evolutionary dynamics ('moran', 'wright-fisher')
+        :return: Dictionary of estimates - {(population size, intensity), (fixation probability, standard error)}
+        """
+        estimates: Dict[Tuple[int, float], Tuple[float, float]] = {}
+        for population_size in population_sizes:
+            for intensity in intensities:
+                estimates[population_size, intensity] = self.fixation_probability(
+                    mutant, resident, population_size, intensity, trajectories, process)
+        return estimates
+
+
+def validate_population(population_size: int, initial: int) -> None:
+    """
+    Checks that the population holds both types at the start
+    :param population_size: Population size
+    :param initial: Initial number of mutants
+    :raises ValueError: if the population size is below 2, or the initial number of mutants is not in [1, N - 1]
+    """
+    if population_size < 2:
+        raise ValueError('Invalid population size.')
+    if initial < 1 or initial >= population_size:
+        raise ValueError('Invalid initial number of mutants.')
+
+
+def invasion(mutant: str, resident: str, error: float, process: str = 'moran') -> None:
+    """
+    Prints whether a single mutant is favoured by selection, i.e. fixates more often than under neutral drift (1/N)
+    """
+    estimator: FixationEstimator = FixationEstimator(10, 25, error)
+    estimates = estimator.sweep(mutant, resident, [10, 20, 50, 100], [0.01, 0.1, 1], process=process)
+    for (population_size, intensity), (probability, standard_error) in estimates.items():
+        print("N = " + str(population_size) + ", w = " + str(intensity) + ": " + str(probability)
+              + " +- " + str(round(standard_error, 4))
+              + (" (invades)" if probability > 1 / population_size else ""))
+
+
+if __name__ == '__main__':
+    invasion('machine_learning', 'grudger', 0)
@@ -1,5 +1,6 @@
 import math
-from typing import List, Dict
+import random
+from typing import List, Dict, Optional, Tuple
 
 import numpy as np
 
@@ -13,7 +14,8 @@ class Simulation:
     Simulation class (main class in the program)
     """
     def __init__(self, players: Dict[str, int], turns_min: int, turns_max: int, error: float, mode: str = 'round-robin',
-                 payoff_matrix: np.ndarray = np.array([[2, 2], [-1, 3], [3, -1], [0, 0]])) -> None:
+                 payoff_matrix: np.ndarray = np.array([[2, 2], [-1, 3], [3, -1], [0, 0]]),
+                 resample_interval: int = 1, sample_size: int = 0) -> None:
         """
         Constructor of the simulation class
         :param players: Dictionary of players (strategy name, number of players of the type)
@@ -23,14 +25,28 @@ class Simulation:
         :param mode: Tournament mode ('round-robin', 'evolution')
         :param payoff_matrix: Dilemma payoff matrix, ndarray
             [ [coop, coop], [coop, deflect], [deflect, coop], [deflect, deflect] ]
+            Any other two-player matrix game may be given in the same layout (see the game module)
+        :param resample_interval: In evolution mode, only the games of the new players are played each generation,
+            the other results are reused. Every resample_interval generations the stochastic games are replayed too,
+            i.e. the games of the stochastic strategies, or all games if error > 0
+            (1 - every generation, 0 - never)
+        :param sample_size: Number of opponents sampled for each player per round, in proportion to the number of
+            players of every strategy. The scores are estimates of the round-robin scores from the games against
+            the player's own sample, and their standard errors are kept in sampling_errors (0 - full round-robin)
         """
         # self.standings: List[Dict[str, int]] = players
+        self.player_counts: Dict[str, int] = {}
         self.players: List[Player] = self.init_players(players)
         self.mode: str = mode
         self.turns_min: int = turns_min
         self.turns_max: int = turns_max
         self.payoff_matrix: np.ndarray = payoff_matrix
         self.error: float = error
+        self.resample_interval: int = resample_interval
+        # results[i, j] - score of self.players[i] in the game against self.players[j]
+        self.results: Optional[np.ndarray] = None
+        self.sample_size: int = sample_size
+        self.sampling_errors: Dict[str, float] = {}
 
     def init_players(self, players: Dict[str, int]) -> List[Player]:
         """
@@ -45,8 +61,19 @@ class Simulation:
                 if i > 0:
                     name += ' #' + str(i+1)
                 player_list.append(Player(strategy.get_strategy(player_type[0]), name))
+            self.player_counts[player_type[0]] = self.player_counts.get(player_type[0], 0) + player_type[1]
         return player_list
 
+    def clone_player(self, player: Player) -> Player:
+        """
+        Creates a new player with the same strategy (and the same strategy object) as the given player
+        :param player: Player to clone
+        :return: New player with a unique name
+        """
+        strategy_name: str = get_strategy_name(player.name)
+        self.player_counts[strategy_name] = self.player_counts.get(strategy_name, 0) + 1
+        return Player(player.strategy, strategy_name + ' #' + str(self.player_counts[strategy_name]))
+
     def round_robin(self) -> Dict[str, int]:
         """
         Simulate a round-robin tournament
@@ -63,22 +90,40 @@ class Simulation:
         return standings
 
     def evolution(self) -> Dict[str, int]:
+        """
+        Simulate an evolution - each generation, the bottom 10% of players are replaced by clones of the top 10%.
+        Only the games of the clones (and, every resample_interval generations, the stochastic games) are played,
+        the results of the other pairs are reused
+        (unless the opponents are sampled, then every generation is a new sampled tournament).
+        :return: Dictionary of the final census - {strategy name, number of players}
+        """
         players_backup: List[Player] = self.players
+        self.players = list(players_backup)
         census: Dict[str, int]
+        changed: Optional[List[int]] = None
 
         for i in range(15):
-            self.tournament()
-
-            self.players = sorted(self.players, key=lambda buffer_player: buffer_player.score, reverse=True)
+            if self.is_sampled():
+                estimates, errors = self.play_sampled_games()
+                for index, player in enumerate(self.players):
+                    player.score = int(round(estimates[index]))
+            else:
+                self.play_games(changed, self.resample_interval > 0 and i % self.resample_interval == 0)
+                for index, player in enumerate(self.players):
+                    player.score = int(self.results[index].sum())
+
+            ranking: List[int] = sorted(range(len(self.players)), key=lambda index: self.players[index].score,
+                                        reverse=True)
 
             cutoff_index: int = math.ceil(0.9*len(self.players))
             replacement_count: int = len(self.players) - cutoff_index
-            self.players = self.players[:cutoff_index]
-            self.players.extend(self.players[:replacement_count])
+            changed = ranking[cutoff_index:]
+            for index, source_index in zip(changed, ranking[:replacement_count]):
+                self.players[index] = self.clone_player(self.players[source_index])
 
             census = {}
             for player in self.players:
-                name: str = player.name if player.name.find('#') == -1 else player.name[:player.name.find('#') - 1]
+                name: str = get_strategy_name(player.name)
                 try:
                     census[name] = census[name] + 1
                 except:
@@ -94,13 +139,129 @@ class Simulation:
         return census
 
     def tournament(self):
-        for i in range(len(self.players) - 1):
-            for j in range(i + 1, len(self.players)):
-                dilemma: Dilemma = Dilemma(self.payoff_matrix,
-                                           self.turns_min, self.turns_max, self.error, self.players[i], self.players[j])
-                result: (int, int) = dilemma.run()
-                self.players[i].score += result[0]
-                self.players[j].score += result[1]
+        """
+        Plays every pair of players (or the sampled opponents) and adds the results to the scores
+        """
+        if self.is_sampled():
+            estimates, errors = self.play_sampled_games()
+            for index, player in enumerate(self.players):
+                player.score += int(round(estimates[index]))
+            return
+
+        self.play_games()
+        for index, player in enumerate(self.players):
+            player.score += int(self.results[index].sum())
+
+    def is_sampled(self) -> bool:
+        """
+        :return: True if the opponents are sampled, i.e. the sample is smaller than the full round-robin
+        """
+        return 0 < self.sample_size < len(self.players) - 1
+
+    def play_sampled_games(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Plays each player against sample_size opponents, stratified by strategy, and estimates the round-robin scores.
+
+        The estimate of a player is the sum over strategies of (number of opponents of the strategy) x
+        (mean score against the sampled opponents of the strategy), so it stays comparable with the round-robin score.
+        A player is scored only in the games against its own sample, drawn without replacement from every strategy,
+        so the standard error includes the finite population correction. The player may also appear in the samples
+        of other players - these games count for the other player only.
+        :return: Estimated round-robin score and its standard error, for every player
+        """
+        player_count: int = len(self.players)
+        strata: Dict[str, List[int]] = {}
+        for index, player in enumerate(self.players):
+            strata.setdefault(get_strategy_name(player.name), []).append(index)
+        strategy_names: List[str] = list(strata.keys())
+        stratum_of: np.ndarray = np.zeros(player_count, dtype=np.int64)
+        for stratum, name in enumerate(strategy_names):
+            stratum_of[strata[name]] = stratum
+
+        records_player: List[int] = []
+        records_stratum: List[int] = []
+        records_score: List[int] = []
+        for stratum, name in enumerate(strategy_names):
+            # Opponents of a player of this stratum - everyone but the player itself
+            sizes: List[int] = [len(strata[other]) - (1 if other == name else 0) for other in strategy_names]
+            allocation: List[int] = allocate_sample(sizes, self.sample_size)
+            for i in strata[name]:
+                for other_stratum, other in enumerate(strategy_names):
+                    count: int = allocation[other_stratum]
+                    if count == 0:
+                        continue
+                    opponents: List[int] = random.sample(strata[other], min(count + 1, len(strata[other])))
+                    opponents = [j for j in opponents if j != i][:count]
+                    for j in opponents:
+                        dilemma: Dilemma = Dilemma(self.payoff_matrix, self.turns_min, self.turns_max, self.error,
+                                                   self.players[i], self.players[j])
+                        result: (int, int) = dilemma.run()
+                        records_player.append(i)
+                        records_stratum.append(other_stratum)
+                        records_score.append(result[0])
+
+        shape: Tuple[int, int] = (player_count, len(strategy_names))
+        games: np.ndarray = np.zeros(shape)
+        sums: np.ndarray = np.zeros(shape)
+        squares: np.ndarray = np.zeros(shape)
+        scores: np.ndarray = np.array(records_score, dtype=float)
+        np.add.at(games, (records_player, records_stratum), 1)
+        np.add.at(sums, (records_player, records_stratum), scores)
+        np.add.at(squares, (records_player, records_stratum), scores ** 2)
+
+        # Fallback for strata without (enough) games - the player's overall mean and variance
+        total_games: np.ndarray = np.maximum(games.sum(axis=1, keepdims=True), 1)
+        overall_mean: np.ndarray = sums.sum(axis=1, keepdims=True) / total_games
+        overall_variance: np.ndarray = np.maximum(squares.sum(axis=1, keepdims=True) / total_games - overall_mean ** 2, 0)
+
+        sampled_games: np.ndarray = np.maximum(games, 1)
+        means: np.ndarray = np.where(games > 0, sums / sampled_games, overall_mean)
+        variances: np.ndarray = np.where(games > 1,
+                                         np.maximum(squares - sums * sums / sampled_games, 0)
+                                         / np.maximum(games - 1, 1),
+                                         overall_variance)
+
+        stratum_sizes: np.ndarray = np.array([len(strata[name]) for name in strategy_names], dtype=float)
+        opponents_count: np.ndarray = np.tile(stratum_sizes, (player_count, 1))
+        opponents_count[np.arange(player_count), stratum_of] -= 1
+
+        finite_population: np.ndarray = np.clip(1 - games / np.maximum(opponents_count, 1), 0, 1)
+        estimates: np.ndarray = (opponents_count * means).sum(axis=1)
+        errors: np.ndarray = np.sqrt((opponents_count ** 2 * variances / sampled_games * finite_population).sum(axis=1))
+
+        self.sampling_errors = {player.name: float(errors[index]) for index, player in enumerate(self.players)}
+        return estimates, errors
+
+    def is_stochastic(self, player: Player) -> bool:
+        """
+        :return: True if the games of the player can end differently on a replay
+        """
+        return self.error > 0 or get_strategy_name(player.name) in strategy.STOCHASTIC_STRATEGIES
+
+    def play_games(self, changed: Optional[List[int]] = None, stochastic: bool = False) -> None:
+        """
+        Plays the games of the round-robin and stores the results in the result matrix
+        :param changed: Indices of the players whose games are played, the other results are kept.
+            If None - every pair of players is played
+        :param stochastic: If true - the games of the stochastic players are played as well
+        """
+        player_count: int = len(self.players)
+        if changed is None or self.results is None or self.results.shape[0] != player_count:
+            self.results = np.zeros((player_count, player_count), dtype=np.int64)
+            pairs = ((i, j) for i in range(player_count - 1) for j in range(i + 1, player_count))
+        else:
+            changed_set = set(changed)
+            if stochastic:
+                changed_set.update(index for index, player in enumerate(self.players) if self.is_stochastic(player))
+            pairs = ((min(i, j), max(i, j)) for i in sorted(changed_set) for j in range(player_count)
+                     if j != i and (j not in changed_set or j > i))
+
+        for i, j in pairs:
+            dilemma: Dilemma = Dilemma(self.payoff_matrix,
+                                       self.turns_min, self.turns_max, self.error, self.players[i], self.players[j])
+            result: (int, int) = dilemma.run()
+            self.results[i, j] = result[0]
+            self.results[j, i] = result[1]
 
     def simulate(self) -> Dict[str, int]:
         """
@@ -154,6 +315,29 @@ class Simulation:
         self.mode = temp_mode
 
 
+def allocate_sample(sizes: List[int], sample_size: int) -> List[int]:
+    """
+    Splits the sample between the strata in proportion to their sizes (largest remainder method)
+    :param sizes: Sizes of the strata
+    :param sample_size: Total sample size, at most the sum of the sizes
+    :return: Sample size of every stratum
+    """
+    total: int = sum(sizes)
+    quotas: List[float] = [sample_size * size / total for size in sizes]
+    allocation: List[int] = [math.floor(quota) for quota in quotas]
+    remainders: List[int] = sorted(range(len(sizes)), key=lambda index: quotas[index] - allocation[index], reverse=True)
+    for index in remainders[:sample_size - sum(allocation)]:
+        allocation[index] += 1
+    return allocation
+
+
+def get_strategy_name(player_name: str) -> str:
+    """
+    Returns the strategy name of the player, i.e. the unique name without the #num suffix
+    """
+    return player_name if player_name.find('#') == -1 else player_name[:player_name.find('#') - 1]
+
+
 def simplest(error: float) -> None:
     """
     Simplest possible simulation
@@ -1,10 +1,12 @@
 from random import random
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Callable, Optional
 
 import numpy as np
 
-import dilemma
 from dilemma import compute_score
+from game import MatrixGame, compile_game
+
+registered_strategies: Dict[str, Callable] = {}
 
 
 def get_strategy(name: str):
@@ -42,10 +44,34 @@ def get_strategy(name: str):
         return retaliate_75
     if name == 'machine_learning':
         return machine_learning_strategy_model().machine_learning
+    if name in registered_strategies:
+        return registered_strategies[name]
 
     raise ValueError('Invalid strategy name.')
 
 
+STRATEGIES: List[str] = ['always_cooperate', 'always_defect', 'tit_for_tat', 'grudger', 'pick_random',
+                         'sus_tit_for_tat', 'tit_for_two_tats', 'two_tits_for_tat', 'pavlov', 'detective',
+                         'simpleton', 'coop_75', 'retaliate_75', 'machine_learning']
+
+# Strategies whose games can end differently on a replay - random moves, or a model that keeps learning
+STOCHASTIC_STRATEGIES: List[str] = ['pick_random', 'coop_75', 'retaliate_75', 'machine_learning']
+
+
+def register_strategy(name: str, strategy) -> None:
+    """
+    Registers an additional strategy, so that players of it can be created by name
+    :param name: Strategy name (must not contain '#' nor be the name of a bundled strategy)
+    :param strategy: Function pointer to the strategy function
+    :raises ValueError: if the name is invalid
+    """
+    if name.find('#') != -1:
+        raise ValueError('Invalid strategy name.')
+    if name in STRATEGIES:
+        raise ValueError('Strategy name taken by a bundled strategy.')
+    registered_strategies[name] = strategy
+
+
 '''
 Strategies available for players of the prisoner's dilemma.
 
@@ -176,14 +202,16 @@ def simpleton(turn: int, turns_min: int, turns_max: int, payoff_matrix: np.ndarr
     """
     if len(opponent_history) == 0:
         return True
-    if opponent_history[-1] is True:
-        if own_history[-1] is True:
-            return True if bool(payoff_matrix[0, 0] > 0) else False
-        return False if bool(payoff_matrix[2, 0] > 0) else True
+    own_payoff: int = compute_score(payoff_matrix, own_history[-1], opponent_history[-1])[0]
+    # After a mutual defection, any nonzero payoff counts as earned
+    if own_history[-1] is False and opponent_history[-1] is False:
+        earned: bool = own_payoff != 0
+    else:
+        earned = own_payoff > 0
 
-    if own_history[-1] is True:
-        return True if bool(payoff_matrix[1, 0] > 0) else False
-    return False if bool(payoff_matrix[3, 0]) > 0 else True
+    if earned:
+        return own_history[-1]
+    return own_history[-1] is not True
 
 def coop_75(turn: int, turns_min: int, turns_max: int, payoff_matrix: np.ndarray, own_history: List[bool],
                      opponent_history: List[bool], own_score: int, opponent_score: int):
@@ -216,6 +244,8 @@ class machine_learning_strategy_model:
                                                                                     (((),()), False): 0.0}
         self.learning_rate: float = learning_rate
         self.discount_factor: float = discount_factor
+        # Compiled game of the last seen payoff matrix, so that the reward lookup is not recompiled every turn
+        self.game: Optional[MatrixGame] = None
 
     def get_state(self, own_moves: List[bool], opponent_moves: List[bool]) -> Tuple[Tuple[bool], Tuple[bool]]:
         """
@@ -244,7 +274,9 @@ class machine_learning_strategy_model:
         state: Tuple[Tuple[bool], Tuple[bool]] = (new_state[0][:-1], new_state[1][:-1])
         action: bool = new_state[0][-1]
         opponent_action: bool = new_state[1][-1]
-        reward: int = dilemma.compute_score(payoff_matrix, action, opponent_action)[0]
+        if self.game is None or self.game.payoff_matrix is not payoff_matrix:
+            self.game = compile_game(payoff_matrix)
+        reward: int = self.game.payoff(self.game.action_index(action), self.game.action_index(opponent_action))[0]
 
         if (state, action) not in self.q_values.keys():
             self.q_values[state, action] = 0.1 if action is True else 0
@@ -271,3 +303,44 @@ class machine_learning_strategy_model:
         action: bool = self.q_values[state, True] >= self.q_values[state, False]
 
         return action
+
+
+class lookup_table_strategy_model:
+    """
+    Class that holds a memory-n lookup table strategy, i.e. one evolved by the genetic search
+    """
+    def __init__(self, table: List[int], opening: List[int], memory: int):
+        """
+        Constructor for lookup table strategy model
+        :param table: 4^memory actions (0 - cooperate, 1 - defect), indexed by the state of the last moves:
+            bit j - own move j+1 turns ago, bit memory+j - opponent move j+1 turns ago (1 - defect)
+        :param opening: Actions of the first memory turns
+        :param memory: Number of remembered turns
+        """
+        self.table: List[int] = [int(action) for action in table]
+        self.opening: List[int] = [int(action) for action in opening]
+        self.memory: int = memory
+
+    def get_state(self, own_moves: List[bool], opponent_moves: List[bool]) -> int:
+        """
+        Creates a state index from the last moves of both players
+        :param own_moves: List of own moves
+        :param opponent_moves: List of opponent moves
+        :return: Index to the lookup table
+        """
+        state: int = 0
+        for j in range(self.memory):
+            if own_moves[-1 - j] is False:
+                state |= 1 << j
+            if opponent_moves[-1 - j] is False:
+                state |= 1 << (self.memory + j)
+        return state
+
+    def lookup_table(self, turn: int, turns_min: int, turns_max: int, payoff_matrix: np.ndarray,
+                     own_history: List[bool], opponent_history: List[bool], own_score: int, opponent_score: int):
+        """
+        Lookup table strategy - plays the opening, then reacts to the last memory turns according to the table
+        """
+        if len(own_history) < self.memory:
+            return self.opening[len(own_history)] == 0
+        return self.table[self.get_state(own_history, opponent_history)] == 0
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import distributed
+
+class distributed_test(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.queue = distributed.WorkQueue(self.directory.name, timeout=60)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_submit(self):
+        task_ids = self.queue.submit({'cooperate': {'players': {'always_cooperate': 3}, 'error': 0}}, 5, 2)
+        self.assertEqual(3, len(task_ids))
+        self.assertEqual(task_ids, self.queue.pending())
+    def test_claim(self):
+        task_id = self.queue.submit({'cooperate': {'players': {'always_cooperate': 3}, 'error': 0}}, 1, 1)[0]
+        self.assertEqual(True, self.queue.claim(task_id, 'worker 1'))
+        self.assertEqual(False, self.queue.claim(task_id, 'worker 2'))
+    def make_stale(self, task_id, generation):
+        stale_time = time.time() - 120
+        os.utime(self.queue.claim_path(task_id, generation), (stale_time, stale_time))
+    def test_reclaim_stale(self):
+        task_id = self.queue.submit({'cooperate': {'players': {'always_cooperate': 3}, 'error': 0}}, 1, 1)[0]
+        self.assertEqual(True, self.queue.claim(task_id, 'crashed worker'))
+        self.make_stale(task_id, 0)
+        other_queue = distributed.WorkQueue(self.directory.name, timeout=60)
+        self.assertEqual(True, other_queue.claim(task_id, 'worker 2'))
+        self.assertEqual([1], self.queue.claim_generations(task_id))
+        self.assertEqual(['000000.1.claim'], os.listdir(self.queue.claims_directory))
+    def test_reclaim_race(self):
+        task_id = self.queue.submit({'cooperate': {'players': {'always_cooperate': 3}, 'error': 0}}, 1, 1)[0]
+        self.assertEqual(True, self.queue.claim(task_id, 'crashed worker'))
+        self.make_stale(task_id, 0)
+        worker_b = distributed.WorkQueue(self.directory.name, timeout=60)
+        worker_c = distributed.WorkQueue(self.directory.name, timeout=60)
+        getmtime = os.path.getmtime
+
+        def take_over_first(path):
+            # Worker C takes the stale claim over right after worker B has read its age
+            modification_time = getmtime(path)
+            with mock.patch('os.path.getmtime', getmtime):
+                self.assertEqual(True, worker_c.claim(task_id, 'worker C'))
+            return modification_time
+
+        with mock.patch('os.path.getmtime', take_over_first):
+            self.assertEqual(False, worker_b.claim(task_id, 'worker B'))
+        self.assertEqual(True, worker_c.owns(task_id, 'worker C'))
+    def test_release_after_takeover(self):
+        task_id = self.queue.submit({'cooperate': {'players': {'always_cooperate': 3}, 'error': 0}}, 1, 1)[0]
+        self.assertEqual(True, self.queue.claim(task_id, 'slow worker'))
+        self.make_stale(task_id, 0)
+        other_queue = distributed.WorkQueue(self.directory.name, timeout=60)
+        self.assertEqual(True, other_queue.claim(task_id, 'worker 2'))
+        self.assertEqual(False, self.queue.heartbeat(task_id, 'slow worker'))
+        self.queue.release(task_id, 'slow worker')
+        self.assertEqual(True, other_queue.owns(task_id, 'worker 2'))
+        self.assertEqual(None, self.queue.run_task(self.queue.read_json(self.queue.task_path(task_id)), 'slow worker'))
+        other_queue.release(task_id, 'worker 2')
+        self.assertEqual([], os.listdir(self.queue.claims_directory))
+    def test_keep_alive(self):
+        queue = distributed.WorkQueue(self.directory.name, timeout=0.2)
+        task_id = queue.submit({'cooperate': {'players': {'always_cooperate': 3}, 'error': 0}}, 1, 1)[0]
+        self.assertEqual(True, queue.claim(task_id, 'worker 1'))
+        stop = distributed.threading.Event()
+        thread = distributed.threading.Thread(target=queue.keep_alive, args=(task_id, 'worker 1', stop))
+        thread.start()
+        time.sleep(0.5)
+        self.assertEqual(False, distributed.WorkQueue(self.directory.name, timeout=0.2).claim(task_id, 'worker 2'))
+        stop.set()
+        thread.join()
+    def test_run_local(self):
+        self.queue.submit({'cooperate': {'players': {'always_cooperate': 3}, 'error': 0},
+                           'defect': {'players': {'always_defect': 2}, 'error': 0}}, 5, 2)
+        merged = distributed.run_local(self.directory.name, 3, timeout=60)
+        self.assertEqual([], self.queue.pending())
+        self.assertEqual({'always_cooperate': 200, 'always_cooperate #2': 200, 'always_cooperate #3': 200},
+                         merged['cooperate'])
+        self.assertEqual({'always_defect': 0, 'always_defect #2': 0}, merged['defect'])
+    def test_failed_task(self):
+        self.queue.submit({'cooperate': {'players': {'always_cooperate': 3}, 'error': 0},
+                           'invalid': {'players': {'no_such_strategy': 2}, 'error': 0}}, 5, 5)
+        self.assertRaises(RuntimeError, distributed.run_local, self.directory.name, 2, 60)
+        self.assertEqual([], self.queue.pending())
+        self.assertEqual([], os.listdir(self.queue.claims_directory))
+        failed = self.queue.failed()
+        self.assertEqual(1, len(failed))
+        self.assertIn('Invalid strategy name', list(failed.values())[0]['error'])
+        merged = self.queue.merge(partial=True)
+        self.assertEqual({'always_cooperate': 200, 'always_cooperate #2': 200, 'always_cooperate #3': 200},
+                         merged['cooperate'])
+    def test_incomplete_merge(self):
+        self.queue.submit({'cooperate': {'players': {'always_cooperate': 3}, 'error': 0}}, 1, 1)
+        self.assertRaises(RuntimeError, self.queue.merge)
+        self.assertEqual({}, self.queue.merge(partial=True))
+    def test_worker_exit_code(self):
+        self.queue.submit({'cooperate': {'players': {'always_cooperate': 3}, 'error': 0}}, 1, 1)
+        with mock.patch('distributed.work', lambda directory, timeout: os._exit(1)):
+            self.assertRaises(RuntimeError, distributed.run_local, self.directory.name, 1, 60)
+
+    if __name__ == '__main__':
+        unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+import game
+import strategy
+from dilemma import Dilemma, compute_score
+from player import Player
+
+class game_test(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.payoff_matrix: np.ndarray = np.array([[2, 2], [-1, 3], [3, -1], [0, 0]])
+
+    def test_payoff(self):
+        prisoners_dilemma: game.MatrixGame = game.MatrixGame(self.payoff_matrix)
+        self.assertEqual(2, prisoners_dilemma.actions)
+        self.assertEqual((2, 2), prisoners_dilemma.payoff(0, 0))
+        self.assertEqual((-1, 3), prisoners_dilemma.payoff(0, 1))
+        self.assertEqual((3, -1), prisoners_dilemma.payoff(1, 0))
+        self.assertEqual((0, 0), prisoners_dilemma.payoff(1, 1))
+        self.assertIs(int, type(prisoners_dilemma.payoff(0, 0)[0]))
+    def test_payoffs(self):
+        prisoners_dilemma: game.MatrixGame = game.MatrixGame(self.payoff_matrix)
+        payoffs1, payoffs2 = prisoners_dilemma.payoffs(np.array([0, 0, 1, 1]), np.array([0, 1, 0, 1]))
+        self.assertEqual([2, -1, 3, 0], payoffs1.tolist())
+        self.assertEqual([2, 3, -1, 0], payoffs2.tolist())
+    def test_three_actions(self):
+        optional: game.MatrixGame = game.get_game('optional_prisoners_dilemma')
+        self.assertEqual(3, optional.actions)
+        self.assertEqual((1, 1), optional.payoff(2, 0))
+        self.assertEqual((3, -1), optional.payoff(1, 0))
+    def test_invalid(self):
+        self.assertRaises(ValueError, game.MatrixGame, np.array([[2, 2], [-1, 3], [3, -1]]))
+        self.assertRaises(ValueError, game.get_game, 'battle_of_the_sexes')
+    def test_compile_game(self):
+        self.assertIs(game.compile_game(self.payoff_matrix), game.compile_game(self.payoff_matrix.copy()))
+    def test_mutated_matrix(self):
+        payoff_matrix: np.ndarray = np.array([[2, 2], [-1, 3], [3, -1], [0, 0]])
+        compiled: game.MatrixGame = game.compile_game(payoff_matrix)
+        self.assertEqual((2, 2), compute_score(payoff_matrix, True, True))
+        payoff_matrix[0, 0] = 7
+        self.assertEqual((7, 2), compute_score(payoff_matrix, True, True))
+        self.assertEqual((2, 2), compiled.payoff(0, 0))
+        self.assertRaises(ValueError, compiled.payoff_matrix.__setitem__, (0, 0), 7)
+    def test_compute_score(self):
+        self.assertEqual((2, 2), compute_score(self.payoff_matrix, True, True))
+        self.assertEqual((-1, 3), compute_score(self.payoff_matrix, True, False))
+        self.assertEqual((3, -1), compute_score(self.payoff_matrix, False, True))
+        self.assertEqual((0, 0), compute_score(self.payoff_matrix, False, False))
+    def test_dilemma(self):
+        dilemma: Dilemma = Dilemma(game.STAG_HUNT, 10, 10, 0, Player(strategy.always_cooperate, 'always_cooperate'),
+                                   Player(strategy.always_defect, 'always_defect'))
+        self.assertEqual((0, 20), dilemma.run())
+        self.assertIs(int, type(dilemma.score1))
+
+    def test_dilemma_three_actions(self):
+        dilemma: Dilemma = Dilemma(game.OPTIONAL_PRISONERS_DILEMMA, 5, 5, 0, Player(strategy.grudger, 'grudger'),
+                                   Player(strategy.always_cooperate, 'always_cooperate'))
+        self.assertEqual((20, 20), dilemma.run())
+        self.assertEqual([True] * 5, dilemma.history1)
+        dilemma = Dilemma(game.OPTIONAL_PRISONERS_DILEMMA, 5, 5, 0, Player(strategy.tit_for_two_tats, 'tit_for_two_tats'),
+                          Player(strategy.always_defect, 'always_defect'))
+        dilemma.run()
+        self.assertEqual([True, True, False, False, False], dilemma.history1)
+        dilemma = Dilemma(game.OPTIONAL_PRISONERS_DILEMMA, 5, 5, 0, Player(strategy.simpleton, 'simpleton'),
+                          Player(lambda *arguments: 2, 'loner'))
+        self.assertEqual((10, 10), dilemma.run())
+        self.assertEqual([True] * 5, dilemma.history1)
+        self.assertEqual([2] * 5, dilemma.history2)
+        dilemma = Dilemma(game.OPTIONAL_PRISONERS_DILEMMA, 5, 5, 1, Player(strategy.grudger, 'grudger'),
+                          Player(strategy.always_cooperate, 'always_cooperate'))
+        dilemma.run()
+        self.assertTrue(all(decision is False or decision == 2 for decision in dilemma.history2))
+
+    if __name__ == '__main__':
+        unittest.main()
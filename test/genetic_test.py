@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+
+import game
+import genetic
+import strategy
+from simulation import Simulation
+
+class genetic_test(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.payoff_matrix: np.ndarray = np.array([[2, 2], [-1, 3], [3, -1], [0, 0]])
+        # Memory-1 tit-for-tat: cooperate first, then copy the opponent's last move (state bit 1)
+        cls.tit_for_tat: np.ndarray = np.array([0, 0, 0, 1, 1], dtype=np.int8)
+
+    def test_batch_strategies(self):
+        rng = np.random.default_rng(0)
+        deterministic = ['always_cooperate', 'always_defect', 'tit_for_tat', 'grudger', 'sus_tit_for_tat',
+                         'tit_for_two_tats', 'two_tits_for_tat', 'pavlov', 'detective', 'simpleton']
+        for payoff_matrix in (self.payoff_matrix, game.CHICKEN):
+            search = genetic.GeneticSearch(payoff_matrix=payoff_matrix)
+            for turn in range(8):
+                own_history = rng.integers(0, 2, size=(64, turn), dtype=np.int8)
+                opponent_history = rng.integers(0, 2, size=(64, turn), dtype=np.int8)
+                for name in deterministic:
+                    batch = genetic.get_batch_strategy(name)(turn, own_history, opponent_history, search.game, rng)
+                    for i in range(64):
+                        expected = strategy.get_strategy(name)(turn + 1, 10, 15, payoff_matrix,
+                                                               [action == 0 for action in own_history[i].tolist()],
+                                                               [action == 0 for action in opponent_history[i].tolist()],
+                                                               0, 0)
+                        self.assertEqual(expected, batch[i] == 0, name + ' at turn ' + str(turn))
+    def test_invalid(self):
+        self.assertRaises(ValueError, genetic.get_batch_strategy, 'machine_learning')
+        lookup_table = strategy.lookup_table_strategy_model([0, 0, 1, 1], [0], 1).lookup_table
+        for name in strategy.STRATEGIES + ['genetic #2']:
+            self.assertRaises(ValueError, strategy.register_strategy, name, lookup_table)
+        self.assertIs(strategy.tit_for_tat, strategy.get_strategy('tit_for_tat'))
+    def test_lookup_table_strategy(self):
+        model = strategy.lookup_table_strategy_model([0, 0, 1, 1], [0], 1)
+        self.assertEqual(True, model.lookup_table(1, 10, 15, self.payoff_matrix, [], [], 0, 0))
+        self.assertEqual(True, model.lookup_table(2, 10, 15, self.payoff_matrix, [False], [True], 3, -1))
+        self.assertEqual(False, model.lookup_table(2, 10, 15, self.payoff_matrix, [True], [False], -1, 3))
+    def test_play(self):
+        search = genetic.GeneticSearch(payoff_matrix=self.payoff_matrix, seed=0)
+        genomes = np.array([self.tit_for_tat] * 4)
+        self.assertEqual([20, 20, 20, 20], search.play(genomes, 'always_cooperate').tolist())
+        self.assertEqual([20, 20, 20, 20], search.play(genomes, 'grudger').tolist())
+        scores = search.play(genomes, 'always_defect')
+        self.assertTrue(((scores >= -1) & (scores < 0)).all())
+    def test_run(self):
+        search = genetic.GeneticSearch(memory=2, population=30, opponents=['always_defect', 'tit_for_tat', 'grudger'],
+                                       seed=1)
+        genomes, fitnesses = search.run(10)
+        self.assertEqual((30, 2 + 16), genomes.shape)
+        self.assertTrue((np.diff(fitnesses) <= 0).all())
+        names = search.register(2, 'genetic_test')
+        self.assertEqual(['genetic_test_1', 'genetic_test_2'], names)
+        result = Simulation({'genetic_test_1': 2, 'tit_for_tat': 1}, 10, 25, 0).simulate()
+        self.assertEqual(3, len(result))
+
+    if __name__ == '__main__':
+        unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+import moran
+
+class moran_test(unittest.TestCase):
+    def setUp(self):
+        self.estimator = moran.FixationEstimator(10, 25, 0, games=5, seed=0)
+
+    def test_payoff(self):
+        self.assertEqual(20, self.estimator.payoff('always_cooperate', 'always_cooperate'))
+        self.assertEqual(30, self.estimator.payoff('always_defect', 'always_cooperate'))
+        self.assertEqual(-10, self.estimator.payoff('always_cooperate', 'always_defect'))
+        self.assertIn(('always_cooperate', 'always_defect'), self.estimator.payoffs)
+    def test_neutral(self):
+        self.assertAlmostEqual(0.1, self.estimator.exact_fixation_probability('tit_for_tat', 'tit_for_tat', 10, 1))
+        probability, standard_error = self.estimator.fixation_probability('tit_for_tat', 'tit_for_tat', 10, 1, 20000)
+        self.assertLess(abs(probability - 0.1), 4 * standard_error)
+    def test_moran(self):
+        exact = self.estimator.exact_fixation_probability('always_defect', 'always_cooperate', 20, 0.05)
+        probability, standard_error = self.estimator.fixation_probability('always_defect', 'always_cooperate', 20,
+                                                                          0.05, 20000)
+        self.assertGreater(exact, 1 / 20)
+        self.assertLess(abs(probability - exact), 4 * standard_error)
+    def test_strong_selection(self):
+        with np.errstate(over='raise', invalid='raise'):
+            exact = self.estimator.exact_fixation_probability('always_defect', 'always_cooperate', 20, 30)
+            probability, standard_error = self.estimator.fixation_probability('always_defect', 'always_cooperate',
+                                                                              20, 30, 2000)
+            self.assertAlmostEqual(1, exact)
+            self.assertAlmostEqual(exact, probability, delta=4 * standard_error + 1e-9)
+            self.assertAlmostEqual(0, self.estimator.exact_fixation_probability('always_cooperate', 'always_defect',
+                                                                                20, 30))
+            probability, standard_error = self.estimator.fixation_probability('always_defect', 'always_cooperate',
+                                                                              20, 30, 2000, 'wright-fisher')
+            self.assertEqual(1, probability)
+    def test_wright_fisher(self):
+        probability, standard_error = self.estimator.fixation_probability('always_cooperate', 'always_defect', 20,
+                                                                          1, 2000, 'wright-fisher')
+        self.assertEqual(0, probability)
+        self.assertRaises(ValueError, self.estimator.fixation_probability, 'always_cooperate', 'always_defect', 20,
+                          1, 10, 'birth-death')
+    def test_invalid_population(self):
+        self.assertRaises(ValueError, self.estimator.fixation_probability, 'tit_for_tat', 'grudger', 1, 1)
+        self.assertRaises(ValueError, self.estimator.fixation_probability, 'tit_for_tat', 'grudger', 10, 1, 10,
+                          'moran', 0)
+        self.assertRaises(ValueError, self.estimator.exact_fixation_probability, 'tit_for_tat', 'grudger', 10, 1, 10)
+        self.assertRaises(ValueError, self.estimator.exact_fixation_probability, 'tit_for_tat', 'grudger', 1, 1)
+        self.assertAlmostEqual(0.9, self.estimator.exact_fixation_probability('tit_for_tat', 'tit_for_tat', 10, 1, 9))
+    def test_sweep(self):
+        estimates = self.estimator.sweep('grudger', 'always_defect', [10, 20], [0.01, 0.1], 1000)
+        self.assertEqual([(10, 0.01), (10, 0.1), (20, 0.01), (20, 0.1)], list(estimates.keys()))
+
+    if __name__ == '__main__':
+        unittest.main()
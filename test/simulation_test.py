@@ -0,0 +1,80 @@
+import random
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import simulation
+from simulation import Simulation
+
+class simulation_test(unittest.TestCase):
+    def test_round_robin(self):
+        result = Simulation({'always_cooperate': 3, 'always_defect': 1}, 10, 25, 0).simulate()
+        self.assertEqual({'always_defect': 90, 'always_cooperate': 30, 'always_cooperate #2': 30,
+                          'always_cooperate #3': 30}, result)
+    def test_clone_player(self):
+        sim = Simulation({'tit_for_tat': 2}, 10, 25, 0)
+        clone = sim.clone_player(sim.players[0])
+        self.assertEqual('tit_for_tat #3', clone.name)
+        self.assertIs(sim.players[0].strategy, clone.strategy)
+        self.assertEqual('tit_for_tat', simulation.get_strategy_name(clone.name))
+    def test_evolution_incremental(self):
+        sim = Simulation({'always_defect': 4, 'tit_for_tat': 6, 'grudger': 6, 'sus_tit_for_tat': 4}, 10, 10, 0)
+        sim.play_games()
+        sim.players[1] = sim.clone_player(sim.players[5])
+        sim.players[7] = sim.clone_player(sim.players[12])
+        sim.play_games([1, 7])
+        incremental_results = sim.results.copy()
+        sim.play_games()
+        np.testing.assert_array_equal(sim.results, incremental_results)
+    def test_replay_stochastic(self):
+        sim = Simulation({'always_defect': 2, 'pick_random': 2, 'tit_for_tat': 2}, 10, 10, 0)
+        self.assertEqual(1, sim.resample_interval)
+        sim.play_games()
+        sim.results[:] = -1000
+        sim.play_games([])
+        self.assertTrue((sim.results == -1000).all())
+        sim.play_games([], True)
+        stochastic = np.array([False, False, True, True, False, False])
+        replayed = stochastic[:, None] | stochastic[None, :]
+        np.fill_diagonal(replayed, False)
+        np.testing.assert_array_equal(replayed, sim.results != -1000)
+        sim.error = 0.1
+        sim.results[:] = -1000
+        sim.play_games([], True)
+        self.assertEqual(6, (sim.results == -1000).sum())
+    def test_evolution_scores(self):
+        sim = Simulation({'always_defect': 2, 'always_cooperate': 8}, 10, 25, 0, 'evolution')
+        players = list(sim.players)
+        census = sim.simulate()
+        self.assertEqual(players, sim.players)
+        self.assertEqual(10, sum(census.values()))
+        self.assertEqual(10, census['always_defect'])
+
+    def test_allocate_sample(self):
+        self.assertEqual([5, 3, 2], simulation.allocate_sample([50, 30, 20], 10))
+        self.assertEqual([1, 1, 1], simulation.allocate_sample([3, 3, 3], 3))
+        self.assertEqual([2, 0], simulation.allocate_sample([9, 1], 2))
+    def test_sampled_round_robin(self):
+        sim = Simulation({'always_cooperate': 50, 'always_defect': 50}, 10, 25, 0, sample_size=8)
+        result = sim.simulate()
+        self.assertEqual(480, result['always_cooperate'])
+        self.assertEqual(1500, result['always_defect #50'])
+        self.assertEqual(0, max(sim.sampling_errors.values()))
+    def test_sampled_own_draws(self):
+        random.seed(0)
+        sim = Simulation({'pick_random': 10, 'always_defect': 10}, 10, 10, 0, sample_size=9)
+        run = simulation.Dilemma.run
+        with mock.patch('simulation.Dilemma.run', autospec=True, side_effect=run) as dilemma_run:
+            estimates, errors = sim.play_sampled_games()
+        self.assertEqual(20 * 9, dilemma_run.call_count)
+        self.assertTrue((errors > 0).all())
+        self.assertTrue((estimates[10:] >= 0).all())
+    def test_sampled_evolution(self):
+        sim = Simulation({'always_defect': 10, 'always_cooperate': 90}, 10, 25, 0, 'evolution', sample_size=6)
+        census = sim.simulate()
+        self.assertEqual(100, sum(census.values()))
+        self.assertEqual(100, census['always_defect'])
+
+    if __name__ == '__main__':
+        unittest.main()